@@ -1,4 +1,5 @@
 import enum
+import re
 
 from typing import Iterator
 
@@ -20,6 +21,27 @@ class TokenType(enum.Enum):
     DIV = 205  # The token '/'
 
 
+# Looking up a member on an `enum.Enum` class goes through its metaclass, which
+# is several times slower than reading a global. The hot loops below compare
+# token kinds against these aliases instead:
+_EOF = TokenType.EOF
+_NUM = TokenType.NUM
+_ADD = TokenType.ADD
+_SUB = TokenType.SUB
+_MUL = TokenType.MUL
+_DIV = TokenType.DIV
+
+# The characters that make up number literals, and the pattern that matches a
+# run of them:
+_DIGITS = frozenset("0123456789")
+_DIGITS_RE = re.compile(r"[0-9]+")
+
+# The characters that separate tokens, which the lexer skips, and the pattern
+# that matches a run of them:
+_BLANKS = frozenset(" \n")
+_BLANKS_RE = re.compile(r"[ \n]+")
+
+
 class Token:
     """
     This class represents a token, which is a basic unit of meaning extracted
@@ -32,8 +54,12 @@ class Token:
         its role in the expression.
     """
 
+    __slots__ = ("text", "kind")
+
     # A list of tokens that represent operators in arithmetic expressions:
-    operators = {TokenType.ADD, TokenType.SUB, TokenType.MUL, TokenType.DIV}
+    operators = frozenset(
+        {TokenType.ADD, TokenType.SUB, TokenType.MUL, TokenType.DIV}
+    )
 
     def __init__(self, tokenText: str, tokenKind: TokenType) -> None:
         """
@@ -48,6 +74,25 @@ class Token:
         self.kind = tokenKind
 
 
+# Single-character tokens carry no state besides their text and kind, so the
+# lexer hands out these shared instances instead of building new ones:
+_EOF_TOKEN = Token("", _EOF)
+_SINGLETONS = {
+    char: Token(char, kind)
+    for char, kind in [
+        ("+", TokenType.ADD),
+        ("-", TokenType.SUB),
+        ("*", TokenType.MUL),
+        ("/", TokenType.DIV),
+        ("(", TokenType.LPR),
+        (")", TokenType.RPR),
+    ]
+}
+
+# Dispatch table for operators and parentheses, indexed by `ord(char)`:
+_CHAR_TABLE = [_SINGLETONS.get(chr(code)) for code in range(128)]
+
+
 class Lexer:
     """
     This class implements a simple lexer. It processes an input string and
@@ -74,78 +119,130 @@ class Lexer:
         self.input_string = input_string
         self.position = 0
         self.length = len(input_string)
+        self._tokens = None  # The tokens, once `tokens` has scanned them all
 
-    def next_valid_token(self) -> Token:
+    def tokens(self) -> Iterator[Token]:
         """
-        Retrieves the next valid token that is not a white space or a new line.
+        Generator that yields the tokens of the input string.
 
-        This method skips any tokens that are classified as white space or new
-        line and returns the first non-whitespace token found.
+        This method continues to yield tokens until the end of the file is
+        reached. Tokens are scanned as they are requested, and the first call
+        that reaches the end of the input stores them; later calls replay them
+        without scanning again.
 
-        Returns:
-            token (Token): The next valid token in the input stream.
+        Yields:
+            Token: The next valid token in the input stream.
 
         Examples:
             >>> lexer = Lexer("1 2 +")
-            >>> next_valid_token = lexer.next_valid_token()
-            >>> print(vars(next_valid_token))
-            {'text': '1', 'kind': <TokenType.NUM: 2>}
+            >>> token_iterator = lexer.tokens()
+            >>> token = next(token_iterator)
+            >>> token.text, token.kind
+            ('1', <TokenType.NUM: 2>)
+
+            >>> token = next(token_iterator)
+            >>> token.text, token.kind
+            ('2', <TokenType.NUM: 2>)
 
-            >>> next_valid_token = lexer.next_valid_token()
-            >>> print(vars(next_valid_token))
-            {'text': '2', 'kind': <TokenType.NUM: 2>}
+            >>> token = next(token_iterator)
+            >>> token.text, token.kind
+            ('+', <TokenType.ADD: 202>)
 
-            >>> next_valid_token = lexer.next_valid_token()
-            >>> print(vars(next_valid_token))
-            {'text': '+', 'kind': <TokenType.ADD: 202>}
+            >>> next(token_iterator, None) is None
+            True
+
+            >>> [token.text for token in lexer.tokens()]
+            ['1', '2', '+']
+
+            >>> lexer = Lexer("1 2 x 3")
+            >>> next(lexer.tokens()).text
+            '1'
         """
 
-        token = self.getToken()
+        if self._tokens is not None:
+            yield from self._tokens
+            return
 
-        if token.kind in [TokenType.WSP, TokenType.NLN]:
-            token = self.next_valid_token()
+        position = self.position
+        scanned = []
 
-        return token
+        try:
+            for token in self._scan():
+                scanned.append(token)
+                yield token
+        except ValueError:
+            # Leave the lexer as it was, so that retrying fails again
+            # instead of resuming after the bad character
+            self.position = position
+            raise
 
-    def tokens(self) -> Iterator[Token]:
+        self._tokens = tuple(scanned)
+
+    def tokenize_all(self) -> tuple[Token, ...]:
         """
-        Generator that yields valid tokens from the input string, ignoring
-        white spaces and new lines.
+        Returns the tokens between the current position and the end of the
+        input string.
 
-        This method continues to yield tokens until the end of the file is
-        reached.
+        The first call scans the rest of the input; later calls, as well as
+        `tokens`, return the same tuple without scanning again.
 
-        Yields:
-            Token: The next valid token in the input stream.
+        Returns:
+            tuple[Token, ...]: The remaining tokens in the input stream, in
+            order.
 
         Examples:
-            >>> lexer = Lexer("1 2 +")
-            >>> token_iterator = lexer.tokens()
-            >>> print(vars(next(token_iterator)))
-            {'text': '1', 'kind': <TokenType.NUM: 2>}
+            >>> lexer = Lexer("+ 12 (3)")
+            >>> [token.text for token in lexer.tokenize_all()]
+            ['+', '12', '(', '3', ')']
+
+            >>> lexer = Lexer("+ 1 2 3")
+            >>> compute_prefix(lexer).eval()
+            3
+            >>> [token.text for token in lexer.tokenize_all()]
+            ['3']
+
+            >>> lexer = Lexer("1 x 2")
+            >>> lexer.tokenize_all()
+            Traceback (most recent call last):
+            ...
+            ValueError: Unexpected character: x
+            >>> lexer.tokenize_all()
+            Traceback (most recent call last):
+            ...
+            ValueError: Unexpected character: x
+        """
+
+        if self._tokens is None:
+            # Running `tokens` to the end is what fills the cache
+            for _ in self.tokens():
+                pass
 
-            >>> print(vars(next(token_iterator)))
-            {'text': '2', 'kind': <TokenType.NUM: 2>}
+        return self._tokens
 
-            >>> print(vars(next(token_iterator)))
-            {'text': '+', 'kind': <TokenType.ADD: 202>}
+    def _scan(self) -> Iterator[Token]:
         """
+        Generator that yields the tokens between the current position and the
+        end of the input string.
 
-        token = self.getToken()
+        Yields:
+            Token: The next valid token in the input stream.
+        """
 
-        while token.kind != TokenType.EOF:
-            if token.kind not in [TokenType.WSP, TokenType.NLN]:
-                yield token
+        # Bind the method once, rather than looking it up for every token:
+        get_token = self.getToken
+        token = get_token()
 
-            token = self.getToken()
+        while token.kind is not _EOF:
+            yield token
+            token = get_token()
 
     def getToken(self) -> Token:
         """
         Retrieves the next token from the input string.
 
-        The lexer reads characters from the input string, classifies them
-        according to their type (e.g., operator, number, white space), and
-        returns a Token object.
+        The lexer skips any white spaces and new lines, then reads characters
+        from the input string, classifies them according to their type (e.g.,
+        operator, number), and returns a Token object.
 
         Returns:
             Token: The next token identified in the input string.
@@ -153,73 +250,66 @@ class Lexer:
         Examples:
             >>> lexer = Lexer("1 2 +")
             >>> token = lexer.getToken()
-            >>> vars(token)
-            {'text': '1', 'kind': <TokenType.NUM: 2>}
+            >>> token.text, token.kind
+            ('1', <TokenType.NUM: 2>)
 
             >>> token = lexer.getToken()
-            >>> vars(token)
-            {'text': ' ', 'kind': <TokenType.WSP: 1>}
+            >>> token.text, token.kind
+            ('2', <TokenType.NUM: 2>)
 
             >>> token = lexer.getToken()
-            >>> vars(token)
-            {'text': '2', 'kind': <TokenType.NUM: 2>}
-
-            >>> token = lexer.getToken()
-            >>> vars(token)
-            {'text': ' ', 'kind': <TokenType.WSP: 1>}
-
-            >>> token = lexer.getToken()
-            >>> vars(token)
-            {'text': '+', 'kind': <TokenType.ADD: 202>}
+            >>> token.text, token.kind
+            ('+', <TokenType.ADD: 202>)
 
         Raises:
             ValueError: Raised if the character is not associated with any known
             tokens.
         """
 
-        if self.position >= self.length:
-            return Token("", TokenType.EOF)
+        input_string = self.input_string
+        length = self.length
+        position = self.position
 
-        current_char = self.input_string[self.position]
-        self.position += 1
+        if position >= length:
+            return _EOF_TOKEN
 
-        if current_char.isdigit():
-            # Handle numbers (NUM)
-            number_text = current_char
-            while (
-                self.position < self.length
-                and self.input_string[self.position].isdigit()
-            ):
-                number_text += self.input_string[self.position]
-                self.position += 1
-            return Token(number_text, TokenType.NUM)
+        current_char = input_string[position]
 
-        elif current_char == "+":
-            return Token(current_char, TokenType.ADD)
+        # Runs of blanks and digits are scanned with regular expressions, which
+        # loop in C. Calling them costs more than a short Python loop, though,
+        # so they are only used once a run goes past its first character:
+        if current_char in _BLANKS:
+            position += 1
+            if position < length and input_string[position] in _BLANKS:
+                position = _BLANKS_RE.match(input_string, position).end()
 
-        elif current_char == "-":
-            return Token(current_char, TokenType.SUB)
+            if position >= length:
+                self.position = position
+                return _EOF_TOKEN
 
-        elif current_char == "*":
-            return Token(current_char, TokenType.MUL)
+            current_char = input_string[position]
 
-        elif current_char == "/":
-            return Token(current_char, TokenType.DIV)
+        if current_char in _DIGITS:
+            # Handle numbers (NUM)
+            end = position + 1
+            if end < length and input_string[end] in _DIGITS:
+                end = _DIGITS_RE.match(input_string, end).end()
+            self.position = end
+            return Token(input_string[position:end], _NUM)
 
-        elif current_char == "(":
-            return Token(current_char, TokenType.LPR)
+        self.position = position + 1
+        code = ord(current_char)
+        token = _CHAR_TABLE[code] if code < 128 else None
 
-        elif current_char == ")":
-            return Token(current_char, TokenType.RPR)
+        if token is None:
+            raise ValueError(f"Unexpected character: {current_char}")
 
-        elif current_char == " ":
-            return Token(current_char, TokenType.WSP)
+        return token
 
-        elif current_char == "\n":
-            return Token(current_char, TokenType.NLN)
 
-        else:
-            raise ValueError(f"Unexpected character: {current_char}")
+# `Num` nodes are never modified after construction, so the most common
+# literals can share a single node, much like CPython caches small integers:
+_NUM_CACHE = {value: Num(value) for value in range(257)}
 
 
 def compute_prefix(lexer: Lexer) -> Expression:
@@ -227,6 +317,11 @@ def compute_prefix(lexer: Lexer) -> Expression:
     Converts an arithmetic expression in Polish Notation to an expression tree.
 
     This function converts a string into an expression tree, and returns it.
+    Instead of recursing on the operands of each operator, it keeps the
+    operators that are still waiting for their operands in an explicit stack,
+    so deeply nested expressions do not exhaust Python's recursion limit. It
+    reads tokens only up to the end of the expression, so the lexer can still
+    be used to read what follows.
 
     Parameters:
         lexer (Lexer): An instance of the Lexer class, initialized with a string
@@ -248,26 +343,55 @@ def compute_prefix(lexer: Lexer) -> Expression:
         >>> e = compute_prefix(lexer)
         >>> e.eval()
         14
+
+        >>> lexer = Lexer("+ 1 2 * 3 4")
+        >>> compute_prefix(lexer).eval()
+        3
+        >>> compute_prefix(lexer).eval()
+        12
+
+        >>> e = compute_prefix(Lexer("-" * 5000 + " 1" * 5001))
+        >>> type(e).__name__
+        'Sub'
     """
-    token = lexer.next_valid_token()
-
-    if token.kind == TokenType.NUM:
-        # Base case: return the value if it's a number
-        return Num(int(token.text))
-
-    elif token.kind in Token.operators:
-        # Recursive case: evaluate the operands
-        a = compute_prefix(lexer)
-        b = compute_prefix(lexer)
-
-        if token.kind == TokenType.ADD:
-            return Add(a, b)
-        elif token.kind == TokenType.SUB:
-            return Sub(a, b)
-        elif token.kind == TokenType.MUL:
-            return Mul(a, b)
-        elif token.kind == TokenType.DIV:
-            return Div(a, b)
-
-    else:
-        raise ValueError(f"Unexpected token type: {token.kind}")
+    # Each entry holds an operator's node class and its left operand, once
+    # known:
+    pending = []
+
+    while True:
+        token = lexer.getToken()
+        kind = token.kind
+
+        # Kinds are told apart by identity rather than through a set or dict:
+        # `enum.Enum` computes hashes in Python code, which costs several times
+        # more than these comparisons
+        if kind is _NUM:
+            value = int(token.text)
+            num = _NUM_CACHE.get(value)
+            node = num if num is not None else Num(value)
+
+        else:
+            if kind is _ADD:
+                operation = Add
+            elif kind is _SUB:
+                operation = Sub
+            elif kind is _MUL:
+                operation = Mul
+            elif kind is _DIV:
+                operation = Div
+            else:
+                raise ValueError(f"Unexpected token type: {kind}")
+
+            # Postpone the operator until both of its operands are built
+            pending.append([operation, None])
+            continue
+
+        # Close every operator whose right operand is the node just built
+        while pending and pending[-1][1] is not None:
+            operation, left = pending.pop()
+            node = operation(left, node)
+
+        if not pending:
+            return node
+
+        pending[-1][1] = node
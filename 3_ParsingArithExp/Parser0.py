@@ -30,7 +30,7 @@ def parse_infix(lexer) -> Expression:
         14
     """
 
-    token = lexer.next_valid_token()
+    token = lexer.getToken()
 
     if token.kind == TokenType.NUM:
         # Base case: return the value if it's a number
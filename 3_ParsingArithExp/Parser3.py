@@ -63,11 +63,11 @@ class Parser:
 
     def __init__(self, lexer: Lexer) -> None:
         self.lexer = lexer
-        self.current_token = self.lexer.next_valid_token()
+        self.current_token = self.lexer.getToken()
 
     def eat(self, token_type: TokenType) -> None:
         if self.current_token.kind == token_type:
-            self.current_token = self.lexer.next_valid_token()
+            self.current_token = self.lexer.getToken()
         else:
             raise ValueError(f"Unexpected token: {self.current_token.kind}")
 